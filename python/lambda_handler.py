@@ -1,22 +1,80 @@
+import asyncio
+import glob
+import gzip
 import json
 import os
+import shutil
+import time
+import aioboto3
 import boto3
+import orjson
 import uuid
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+from boto3.dynamodb.types import TypeSerializer
+from boto3.s3.transfer import TransferConfig
 
-# Import the SAR processing module
-from micro_motion_estimator import MicroMotionEstimator
+# zstd compresses the results payload ~5-10x at negligible CPU cost;
+# fall back to gzip when the library is not in the layer
+try:
+    import zstandard as zstd
+    _ZSTD = zstd.ZstdCompressor(level=3)
+except ImportError:
+    _ZSTD = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
-jobs_table = dynamodb.Table(os.environ.get('JOBS_TABLE', 'ShipMMJobs'))
+# Let rasterio/GDAL stream rasters straight from S3 via /vsis3 without
+# directory listings or full-object downloads
+os.environ.setdefault('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
+os.environ.setdefault('CPL_VSIL_CURL_ALLOWED_EXTENSIONS', '.tif,.tiff')
+
+# Shared client config: adaptive retries honor server throttling hints,
+# keepalive avoids NAT idle resets during long compute gaps, and tight
+# timeouts stop a stalled transfer from eating billed seconds
+_CLIENT_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True,
+    max_pool_connections=32,
+    connect_timeout=3,
+    read_timeout=60
+)
+
+# Initialize AWS clients at module scope so connections survive warm invocations
+s3_client = boto3.client('s3', config=_CLIENT_CONFIG)
+# Low-level DynamoDB client plus a cached serializer; cheaper per call
+# than the resource layer's per-put serializer construction
+dynamodb_client = boto3.client('dynamodb', config=_CLIENT_CONFIG)
+_SERIALIZER = TypeSerializer()
+_JOBS_TABLE_NAME = os.environ.get('JOBS_TABLE', 'ShipMMJobs')
+
+# Session for async S3 clients; the handler opens one client per invocation
+_AIO_SESSION = aioboto3.Session()
+
+# Job records expire after a week via DynamoDB TTL
+_TTL_SECONDS = 7 * 86400
+
+# ETag-keyed input cache in warm-sandbox ephemeral storage
+_CACHE_DIR = '/tmp/cache'
+_CACHE_MAX_ENTRIES = 4
+
+# Small pool for fire-and-forget status writes so intermediate DynamoDB
+# round-trips overlap with the S3 download instead of blocking it
+_STATUS_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+
+# Shared transfer config so the multipart thread pool is created once per
+# sandbox and reused by every download/upload
+_TRANSFER_CFG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
 
 def handler(event, context):
     """
@@ -27,10 +85,47 @@ def handler(event, context):
         context (LambdaContext): Runtime information
         
     Returns:
-        dict: Response with job ID and status
+        dict: Response with job ID and status (or a list of per-record
+        responses for batch events)
+    """
+    records = event.get('Records', [])
+
+    # Warm sandboxes reuse /tmp; clear leftovers from earlier invocations
+    # once here, before any record starts, so concurrent workers never
+    # delete each other's in-flight files
+    _purge_tmp()
+
+    if len(records) <= 1:
+        return asyncio.run(_handler_async(event, context))
+
+    # Batch S3/SQS events carry independent SAR files; fan them out on
+    # threads instead of silently dropping all but the first. Threads,
+    # not processes: the Lambda runtime has no /dev/shm, so
+    # multiprocessing pools fail at startup there, and the NumPy/FFT
+    # stages release the GIL anyway
+    with ThreadPoolExecutor(max_workers=min(len(records), os.cpu_count() or 1)) as executor:
+        responses = list(executor.map(_process_record, records))
+
+    return {
+        'statusCode': 200,
+        'batchSize': len(responses),
+        'results': responses
+    }
+
+def _process_record(record):
+    """Process one event record in a worker thread"""
+    return asyncio.run(_handler_async({'Records': [record]}, None))
+
+async def _handler_async(event, context):
+    """
+    Async body of the handler: S3 transfers and DynamoDB writes overlap
+    with each other and with the CPU-bound estimation, which runs in the
+    default executor
     """
     logger.info(f"Received event: {json.dumps(event)}")
-    
+
+    local_input_file = None
+    status_future = None
     try:
         # Generate a unique job ID
         job_id = str(uuid.uuid4())
@@ -49,42 +144,66 @@ def handler(event, context):
         if not bucket_name or not object_key:
             raise ValueError("Missing bucket name or object key")
         
-        # Update job status to 'PROCESSING'
-        update_job_status(job_id, 'PROCESSING')
-        
-        # Download the input file
-        local_input_file = f"/tmp/{os.path.basename(object_key)}"
-        s3_client.download_file(bucket_name, object_key, local_input_file)
-        
-        # Process the SAR data
-        results_bucket = os.environ.get('RESULTS_BUCKET', 'ship-mm-results')
-        output_key = f"results/{job_id}/results.json"
-        local_output_file = f"/tmp/results_{job_id}.json"
-        
-        # Initialize and run the micro-motion estimator
-        estimator = MicroMotionEstimator(local_input_file)
-        results = estimator.process()
+        # Update job status to 'PROCESSING' in the background; only the
+        # terminal COMPLETED/FAILED write needs to be synchronous. Keep
+        # the future: it must be settled before the terminal write below
+        status_future = _STATUS_EXECUTOR.submit(update_job_status, job_id, 'PROCESSING')
         
-        # Save results to local file
-        with open(local_output_file, 'w') as f:
-            json.dump(results, f)
-        
-        # Upload results to S3
-        s3_client.upload_file(local_output_file, results_bucket, output_key)
-        
-        # Generate visualization outputs
-        visualization_keys = generate_visualizations(estimator, job_id, results_bucket)
+        loop = asyncio.get_running_loop()
+
+        async with _AIO_SESSION.client('s3', config=_CLIENT_CONFIG) as s3:
+            # GDAL-readable rasters stream directly from S3 via /vsis3,
+            # skipping the copy through ephemeral storage entirely; other
+            # formats go through the ETag-keyed /tmp cache
+            if object_key.lower().endswith(('.tif', '.tiff')):
+                input_source = f"/vsis3/{bucket_name}/{object_key}"
+            else:
+                local_input_file = await _fetch_input_cached(s3, bucket_name, object_key)
+                input_source = local_input_file
+
+            # Process the SAR data
+            results_bucket = os.environ.get('RESULTS_BUCKET', 'ship-mm-results')
+
+            # Imported lazily: it pulls in numpy/scipy/matplotlib, which
+            # would otherwise be paid on every cold start, error path
+            # included
+            from micro_motion_estimator import MicroMotionEstimator
+
+            # Initialize and run the micro-motion estimator off the event
+            # loop so I/O can keep progressing underneath it
+            estimator = MicroMotionEstimator(input_source)
+            results = await loop.run_in_executor(None, estimator.process)
+
+            # Serialize with orjson and compress before upload: the ship
+            # lists and frequency arrays shrink several-fold, cutting PUT
+            # bytes and upload time
+            body, content_encoding, ext = _compress_results(
+                orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY)
+            )
+            output_key = f"results/{job_id}/results.json{ext}"
+
+            # Overlap the results upload with visualization rendering/upload
+            _, visualization_keys = await asyncio.gather(
+                s3.put_object(
+                    Bucket=results_bucket,
+                    Key=output_key,
+                    Body=body,
+                    ContentEncoding=content_encoding,
+                    ContentType='application/json'
+                ),
+                loop.run_in_executor(None, generate_visualizations, estimator, job_id, results_bucket)
+            )
         
-        # Update job status to 'COMPLETED'
+        # Update job status to 'COMPLETED'; the background PROCESSING
+        # write has to land (or be cancelled) first, or a retry-delayed
+        # put could arrive after this one and record the finished job
+        # as PROCESSING forever
+        _settle_status_future(status_future)
         update_job_status(job_id, 'COMPLETED', {
             'resultsKey': output_key,
             'visualizations': visualization_keys
         })
         
-        # Clean up temporary files
-        os.remove(local_input_file)
-        os.remove(local_output_file)
-        
         return {
             'statusCode': 200,
             'jobId': job_id,
@@ -100,6 +219,7 @@ def handler(event, context):
         
         # Update job status to 'FAILED'
         if job_id:
+            _settle_status_future(status_future)
             update_job_status(job_id, 'FAILED', {
                 'error': error_message
             })
@@ -110,6 +230,100 @@ def handler(event, context):
             'status': 'FAILED',
             'error': error_message
         }
+    finally:
+        # Cached inputs are left in place for reuse and evicted by LRU;
+        # only remove inputs that live outside the cache
+        if local_input_file and not local_input_file.startswith(_CACHE_DIR):
+            try:
+                os.remove(local_input_file)
+            except OSError:
+                pass
+
+def _settle_status_future(future):
+    """
+    Cancel or wait out a background status write before writing a
+    terminal status, so DynamoDB sees the writes in program order
+
+    Parameters:
+        future: Future from _STATUS_EXECUTOR, or None
+    """
+    if future is None or future.cancel():
+        return
+    try:
+        # update_job_status logs its own errors, so this only guards
+        # against an executor-level surprise
+        future.result(timeout=60)
+    except Exception as e:
+        logger.error(f"Background status update did not settle: {str(e)}")
+
+def _compress_results(payload):
+    """
+    Compress serialized results for upload
+
+    Parameters:
+        payload (bytes): Serialized JSON document
+
+    Returns:
+        tuple: (compressed bytes, Content-Encoding value, key suffix)
+    """
+    if _ZSTD is not None:
+        return _ZSTD.compress(payload), 'zstd', '.zst'
+    return gzip.compress(payload, compresslevel=1), 'gzip', '.gz'
+
+async def _fetch_input_cached(s3, bucket_name, object_key):
+    """
+    Return a local path for the S3 object, downloading it only if the
+    object's ETag is not already cached in this sandbox
+
+    Parameters:
+        s3: Async S3 client
+        bucket_name (str): Source bucket
+        object_key (str): Source key
+
+    Returns:
+        str: Path to the local copy of the object
+    """
+    head = await s3.head_object(Bucket=bucket_name, Key=object_key)
+    etag = head['ETag'].strip('"')
+    suffix = os.path.splitext(object_key)[1]
+    cached_file = os.path.join(_CACHE_DIR, etag + suffix)
+
+    if os.path.exists(cached_file):
+        logger.info(f"Input cache hit for {object_key} (ETag {etag})")
+        os.utime(cached_file, None)
+        return cached_file
+
+    os.makedirs(_CACHE_DIR, exist_ok=True)
+    _evict_cache()
+    await s3.download_file(bucket_name, object_key, cached_file, Config=_TRANSFER_CFG)
+    return cached_file
+
+def _evict_cache():
+    """Drop the least recently used cache entries down to the size cap"""
+    entries = sorted(glob.glob(os.path.join(_CACHE_DIR, '*')), key=os.path.getmtime)
+    while len(entries) >= _CACHE_MAX_ENTRIES:
+        try:
+            os.remove(entries.pop(0))
+        except OSError:
+            pass
+
+def _purge_tmp():
+    """
+    Best-effort removal of stale /tmp contents left behind by previous
+    invocations of this sandbox (e.g. after a crash or timeout)
+    """
+    for path in glob.glob('/tmp/*'):
+        name = os.path.basename(path)
+        # Leave AWS runtime internals and our input cache alone
+        if name.startswith('aws-') or name == 'invoke-contexts' or path == _CACHE_DIR:
+            continue
+        try:
+            if os.path.isfile(path) or os.path.islink(path):
+                os.remove(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
 
 def update_job_status(job_id, status, metadata=None):
     """
@@ -121,21 +335,68 @@ def update_job_status(job_id, status, metadata=None):
         metadata (dict): Additional metadata
     """
     try:
+        now = time.time()
         item = {
             'jobId': job_id,
             'status': status,
-            'updatedAt': datetime.utcnow().isoformat(),
-            'expiresAt': int((datetime.utcnow() + timedelta(days=7)).timestamp())
+            'updatedAt': datetime.utcfromtimestamp(now).isoformat(),
+            'expiresAt': int(now) + _TTL_SECONDS
         }
-        
+
         if metadata:
             item.update(metadata)
-        
-        jobs_table.put_item(Item=item)
+
+        dynamodb_client.put_item(
+            TableName=_JOBS_TABLE_NAME,
+            Item={k: _SERIALIZER.serialize(v) for k, v in item.items()}
+        )
         logger.info(f"Updated job status: {job_id} -> {status}")
     except Exception as e:
         logger.error(f"Failed to update job status: {str(e)}")
 
+def batch_update_job_statuses(updates):
+    """
+    Write many job-status records in one batched call (25 items per
+    request), for bulk reprocessing invocations
+
+    Parameters:
+        updates (list): Tuples of (job_id, status, metadata)
+    """
+    try:
+        put_requests = []
+        now = time.time()
+        for job_id, status, metadata in updates:
+            item = {
+                'jobId': job_id,
+                'status': status,
+                'updatedAt': datetime.utcfromtimestamp(now).isoformat(),
+                'expiresAt': int(now) + _TTL_SECONDS
+            }
+            if metadata:
+                item.update(metadata)
+            put_requests.append({
+                'PutRequest': {
+                    'Item': {k: _SERIALIZER.serialize(v) for k, v in item.items()}
+                }
+            })
+
+        for i in range(0, len(put_requests), 25):
+            request_items = {_JOBS_TABLE_NAME: put_requests[i:i + 25]}
+            # batch_write_item returns throttled items as UnprocessedItems
+            # rather than raising; resubmit them with backoff so partial
+            # throttling does not silently drop status records
+            for attempt in range(5):
+                response = dynamodb_client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+                time.sleep(0.1 * 2 ** attempt)
+            if request_items:
+                dropped = sum(len(v) for v in request_items.values())
+                logger.error(f"Gave up on {dropped} unprocessed status writes after retries")
+    except Exception as e:
+        logger.error(f"Failed to batch update job statuses: {str(e)}")
+
 def generate_visualizations(estimator, job_id, results_bucket):
     """
     Generate visualization files and upload them to S3
@@ -149,25 +410,35 @@ def generate_visualizations(estimator, job_id, results_bucket):
         dict: Keys of visualization files
     """
     visualization_keys = {}
-    
+
     try:
-        # Generate displacement field plot
+        # Render both plots first, then upload them concurrently so the two
+        # S3 round-trips overlap instead of running back to back
         displacement_file = f"/tmp/displacement_{job_id}.png"
         estimator.plot_displacement_field(displacement_file)
-        displacement_key = f"results/{job_id}/displacement.png"
-        s3_client.upload_file(displacement_file, results_bucket, displacement_key)
-        visualization_keys['displacement'] = displacement_key
-        os.remove(displacement_file)
-        
-        # Generate frequency mode visualization
         frequency_file = f"/tmp/frequency_{job_id}.png"
         estimator.plot_frequency_modes(frequency_file)
-        frequency_key = f"results/{job_id}/frequency.png"
-        s3_client.upload_file(frequency_file, results_bucket, frequency_key)
-        visualization_keys['frequency'] = frequency_key
-        os.remove(frequency_file)
-        
+
+        uploads = {
+            'displacement': (displacement_file, f"results/{job_id}/displacement.png"),
+            'frequency': (frequency_file, f"results/{job_id}/frequency.png")
+        }
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                name: executor.submit(
+                    s3_client.upload_file, path, results_bucket, key, Config=_TRANSFER_CFG
+                )
+                for name, (path, key) in uploads.items()
+            }
+            for name, future in futures.items():
+                future.result()
+                visualization_keys[name] = uploads[name][1]
+
+        for path, _ in uploads.values():
+            os.remove(path)
+
     except Exception as e:
         logger.error(f"Error generating visualizations: {str(e)}")
-    
+
     return visualization_keys 
\ No newline at end of file
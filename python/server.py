@@ -1,19 +1,53 @@
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import asyncio
 import os
 import sys
-import json
+import orjson
 from typing import Dict, Any
 import tempfile
-import base64
+from concurrent.futures import ProcessPoolExecutor
 
 # Add the directory containing micro_motion_estimator.py to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from micro_motion_estimator import MicroMotionEstimator
 
 app = FastAPI()
 
+# Worker pool shared by all requests; processing is CPU-bound, so running
+# it in child processes keeps the event loop (and /health) responsive
+EXECUTOR = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+
+
+def _process_path(temp_path, result_path):
+    """
+    Process one uploaded file in a worker process.
+
+    Runs the full estimator pipeline plus visualization and returns
+    (results_bytes, figures) — both picklable, so the parent never ships
+    NumPy arrays across the process boundary.
+    """
+    # Import inside the worker so the heavy scientific stack loads in the
+    # child, not at server startup
+    from micro_motion_estimator import MicroMotionEstimator
+
+    estimator = MicroMotionEstimator(config={
+        "input_file": temp_path,
+        "output_file": result_path
+    })
+    results = estimator.process_image(temp_path)
+
+    # Serialize once with orjson (handles the NumPy arrays natively)
+    # and reuse the bytes for both the debug file and the response
+    results_bytes = orjson.dumps(results, option=orjson.OPT_SERIALIZE_NUMPY)
+    with open(result_path, "wb") as f:
+        f.write(results_bytes)
+
+    # Generate visualizations in memory only; the base64 payloads come
+    # straight back from visualize_results, no PNG round-trip on disk
+    visualizations = estimator.visualize_results(results, output_dir=None)
+    return results_bytes, visualizations['base64_images']
+
 # Allow CORS from any origin during development
 app.add_middleware(
     CORSMiddleware,
@@ -29,11 +63,12 @@ async def process_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     # Create a temporary directory
     temp_dir = tempfile.mkdtemp()
     
-    # Save uploaded file to temp file
+    # Stream the upload to disk in 1 MB chunks so a multi-GB SAR file
+    # never has to fit in memory alongside the processing pipeline
     temp_path = os.path.join(temp_dir, file.filename)
     with open(temp_path, "wb") as temp:
-        content = await file.read()
-        temp.write(content)
+        while chunk := await file.read(1 << 20):
+            temp.write(chunk)
     
     # Create results directory if it doesn't exist
     results_dir = os.path.join(temp_dir, "results")
@@ -47,35 +82,15 @@ async def process_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     freq_path = None
     
     try:
-        # Process with your existing code
-        estimator = MicroMotionEstimator(config={
-            "input_file": temp_path,
-            "output_file": result_path
-        })
-        results = estimator.process_image(temp_path)
-        
-        # Save results to JSON file for debugging
-        with open(result_path, "w") as f:
-            json.dump(results, f)
-        
-        # Generate figures and convert to base64
-        figures = {}
-        
-        # Create visualization directory
-        vis_dir = os.path.join(results_dir, "visualizations")
-        os.makedirs(vis_dir, exist_ok=True)
-        
-        # Generate visualizations
-        print(f"Generating visualizations in: {vis_dir}")
-        estimator.visualize_results(results, vis_dir)
-        
-        # Convert visualization files to base64
-        for img_name in os.listdir(vis_dir):
-            if img_name.endswith(".png"):
-                img_path = os.path.join(vis_dir, img_name)
-                key = os.path.splitext(img_name)[0]
-                with open(img_path, "rb") as img:
-                    figures[key] = f"data:image/png;base64,{base64.b64encode(img.read()).decode()}"
+        # Run the CPU-bound pipeline in the worker pool so the event loop
+        # stays free to serve other requests
+        loop = asyncio.get_running_loop()
+        results_bytes, figures = await loop.run_in_executor(
+            EXECUTOR, _process_path, temp_path, result_path
+        )
+
+        # FastAPI's encoder can't walk ndarrays, so hand it plain types
+        results = orjson.loads(results_bytes)
         
         print("Processing complete, returning results")
         return {